@@ -1,13 +1,21 @@
 import streamlit as st
 import pandas as pd
-from math import radians, sin, cos, sqrt, atan2
+from math import radians
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re # Import regex for normalization
 import pydeck as pdk # Import pydeck for advanced mapping
 import json # Import json for pretty printing the raw response
+import html # Import html for escaping values rendered as raw HTML
+import hashlib # Import hashlib for Firestore-safe geocode cache document IDs
+from concurrent.futures import ThreadPoolExecutor # Import for concurrent batch geocoding
+from datetime import datetime, timedelta, timezone # Import for geocode cache expiry
+import threading # Import for the lock guarding the shared data version counters
 import firebase_admin
 from firebase_admin import credentials, firestore
 import polyline # New import for robust polyline decoding
+import numpy as np # Import numpy for vectorized column operations
 
 # --- SET PAGE CONFIGURATION FIRST ---
 # This must be the very first Streamlit command executed
@@ -33,8 +41,13 @@ if not firebase_admin._apps:
     except Exception as e:
         st.error(f"Error initializing Firebase: {e}. Please check your service account credentials.")
 
+@st.cache_resource
+def get_firestore_client():
+    """Creates the Firestore client once per process; reruns and sessions share it."""
+    return firestore.client()
+
 # Get a Firestore client instance
-db = firestore.client()
+db = get_firestore_client()
 
 # --- Security PIN ---
 # Define a 6-digit PIN for adding/editing records
@@ -43,6 +56,22 @@ SECURITY_PIN = "123456"
 # --- Regex Patterns for Validation ---
 CONTACT_NUMBER_PATTERN = r"^\+?[0-9\s()\s-]{7,15}$"
 STORE_HOURS_PATTERN = r"^\d{1,2}(:\d{2})?\s*([AP]M)?\s*-\s*\d{1,2}(:\d{2})?\s*([AP]M)?$"
+CONTACT_NUMBER_RE = re.compile(CONTACT_NUMBER_PATTERN)
+STORE_HOURS_RE = re.compile(STORE_HOURS_PATTERN)
+
+# --- Listing Pagination ---
+# Entries per page in the read-only delivery fee table
+FEE_TABLE_PAGE_SIZE = 50
+# Stores per page in the Add/Edit stores editor
+STORE_LIST_PAGE_SIZE = 50
+
+# --- Map Icons ---
+# Shared icon definitions for the Pydeck IconLayer (scale increased for visibility)
+STORE_ICON_PATH = "M12 2C8.13 2 5 5.13 5 9c0 5.25 7 13 7 13s7-7.75 7-13c0-3.87-3.13-7-7-7zm0 9.5c-1.38 0-2.5-1.12-2.5-2.5S10.62 6.5 12 6.5s2.5 1.12 2.5 2.5-1.12 2.5-2.5 2.5z"
+USER_LOCATION_ICON_PATH = "M20.94 11c-.46-4.17-3.37-7.6-7.14-9.35C13.43 1.25 12.72 1 12 1c-.72 0-1.43.25-1.8.65-3.77 1.75-6.68 5.18-7.14 9.35H2v2h2.06c.46 4.17 3.37 7.6 7.14 9.35.37.18.78.29 1.2.35V24h2v-1.65c.42-.06.83-.17 1.2-.35 3.77-1.75 6.68-5.18 7.14-9.35H22v-2h-1.06zm-8.88 9.35c-2.91-1.47-5.1-4.08-5.78-7.35h11.55c-.68 3.27-2.87 5.88-5.77 7.35z"
+NEAREST_STORE_ICON = {"path": STORE_ICON_PATH, "fill_color": [255, 0, 0], "stroke_width": 0, "fill_opacity": 1.0, "scale": 100}
+STORE_ICON = {"path": STORE_ICON_PATH, "fill_color": [0, 128, 0], "stroke_width": 0, "fill_opacity": 1.0, "scale": 100}
+USER_LOCATION_ICON = {"path": USER_LOCATION_ICON_PATH, "fill_color": [0, 0, 255], "stroke_width": 0, "fill_opacity": 1.0, "scale": 100}
 
 
 # --- Normalization Helper Function ---
@@ -71,104 +100,186 @@ def normalize_string(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-# --- Haversine Distance Calculation ---
-def haversine(lat1, lon1, lat2, lon2):
+# --- HTTP Session for Google Maps APIs ---
+# (connect, read) timeouts in seconds for every Google API request
+GOOGLE_API_TIMEOUT = (3, 5)
+# Concurrent requests for batch geocoding; also the connection pool size, and well under Google's 50 QPS limit
+GOOGLE_API_MAX_WORKERS = 8
+# Geocodes persisted in Firestore are looked up again after this long, so a wrong or outdated result doesn't stick
+GEOCODE_CACHE_MAX_AGE = timedelta(days=30)
+
+@st.cache_resource
+def get_http_session():
+    """Shared requests.Session so Google API calls reuse pooled keep-alive HTTPS connections.
+    Failed connections and 5xx responses are retried twice with a short backoff."""
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset(['GET']))
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=GOOGLE_API_MAX_WORKERS, max_retries=retries))
+    return session
+
+# --- Function to get coordinates from an address using Google Geocoding API ---
+@st.cache_data(ttl=86400, max_entries=1024, show_spinner=False)
+def fetch_geocode(address, api_key_to_use, persist=False):
     """
-    Calculate the distance between two points on Earth using the Haversine formula.
-    Returns distance in kilometers.
+    Calls the Google Geocoding API for an address and returns (latitude, longitude), or None if Google has no match.
+    Results (including "no match") are cached in memory for a day. Store addresses (`persist=True`) are also kept
+    in the 'geocode_cache' Firestore collection for GEOCODE_CACHE_MAX_AGE, so restarts and other replicas skip the
+    API call; addresses typed into the search box are not stored there. API and network errors raise instead,
+    so they are never cached.
     """
-    R = 6371
+    cache_ref = None
+    if persist:
+        # Addresses can contain '/', which Firestore document IDs can't, so the ID is a hash of the address
+        cache_ref = db.collection('geocode_cache').document(hashlib.sha256(address.encode('utf-8')).hexdigest())
+        try:
+            cached = cache_ref.get()
+            if cached.exists:
+                cached_data = cached.to_dict()
+                cached_at = cached_data.get('timestamp')
+                if isinstance(cached_at, datetime) and datetime.now(timezone.utc) - cached_at < GEOCODE_CACHE_MAX_AGE:
+                    return cached_data['latitude'], cached_data['longitude']
+        except Exception:
+            pass # The persistent cache is best-effort; fall back to the API
 
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-
-    distance = R * c
-    return distance
-
-# --- Function to get coordinates from an address using Google Geocoding API ---
-def get_coordinates_from_address(address, api_key_to_use):
+    base_url = "https://maps.googleapis.com/maps/api/geocode/json"
+    params = {
+        "address": address,
+        "key": api_key_to_use
+    }
+    response = get_http_session().get(base_url, params=params, timeout=GOOGLE_API_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+
+    if data["status"] == "OK":
+        location = data["results"][0]["geometry"]["location"]
+        if cache_ref is not None:
+            try:
+                cache_ref.set({'address': address, 'latitude': location["lat"], 'longitude': location["lng"], 'timestamp': firestore.SERVER_TIMESTAMP})
+            except Exception:
+                pass
+        return location["lat"], location["lng"]
+    elif data["status"] == "ZERO_RESULTS":
+        return None
+    raise ValueError(f"{data['status']}. {data.get('error_message', '')}")
+
+def normalize_geocode_address(address):
+    """Case and spacing don't change the geocoding result, so they are normalized out of the cache key."""
+    return " ".join(str(address).split()).lower()
+
+def get_coordinates_from_address(address, api_key_to_use, persist=False):
     """
     Converts an address to latitude and longitude using Google Maps Geocoding API.
+    Pass `persist=True` for store addresses so the result is kept in the Firestore geocode cache.
     Returns (latitude, longitude) or None if not found.
     """
     if not str(api_key_to_use).strip():
         st.error("Google Maps API Key is not configured. Please set it in your Streamlit secrets as 'GOOGLE_MAPS_API_KEY'.")
         return None, None
 
-    base_url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        "address": address,
-        "key": api_key_to_use
-    }
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if data["status"] == "OK":
-            location = data["results"][0]["geometry"]["location"]
-            return location["lat"], location["lng"]
-        else:
-            st.error(f"Error geocoding address '{address}': {data['status']}. {data.get('error_message', '')} Please ensure the address is valid and your API key is correct.")
-            return None, None
+        coordinates = fetch_geocode(normalize_geocode_address(address), api_key_to_use, persist)
     except requests.exceptions.RequestException as e:
         st.error(f"Network error or invalid API key for Geocoding API: {e}. Please check your internet connection and API key configuration.")
         return None, None
+    except ValueError as e:
+        st.error(f"Error geocoding address '{address}': {e} Please ensure the address is valid and your API key is correct.")
+        return None, None
     except Exception as e:
         st.error(f"An unexpected error occurred during geocoding: {e}")
         return None, None
 
-# --- Function to get route polyline and travel time from Google Directions API ---
-def get_route_details(origin_lat, origin_lon, dest_lat, dest_lon, api_key_to_use):
+    if coordinates is None:
+        st.error(f"No location found for address '{address}'. Please check the address and try again.")
+        return None, None
+    return coordinates
+
+def batch_geocode(addresses, api_key_to_use):
     """
-    Gets route polyline and travel time between two points using Google Directions API.
-    Returns (list of [longitude, latitude] pairs, travel_time_text) or (None, None).
+    Geocodes many store addresses concurrently over the shared HTTP session (for bulk edits and imports);
+    results are kept in the persistent geocode cache like single store addresses.
+    Returns a list of (latitude, longitude) in input order, with (None, None) for addresses that failed.
     """
     if not str(api_key_to_use).strip():
-        st.error("Google Maps API Key is not configured. Please set it in your Streamlit secrets as 'GOOGLE_MAPS_API_KEY'. **Also ensure the Directions API is enabled in your Google Cloud Project.**")
-        return None, None
+        st.error("Google Maps API Key is not configured. Please set it in your Streamlit secrets as 'GOOGLE_MAPS_API_KEY'.")
+        return [(None, None)] * len(addresses)
 
+    def geocode_one(address):
+        # Worker threads can't render Streamlit elements, so failures are returned rather than shown
+        try:
+            return fetch_geocode(normalize_geocode_address(address), api_key_to_use, persist=True) or (None, None)
+        except Exception:
+            return None, None
+
+    with ThreadPoolExecutor(max_workers=GOOGLE_API_MAX_WORKERS) as executor:
+        return list(executor.map(geocode_one, addresses))
+
+# --- Function to get route polyline and travel time from Google Directions API ---
+# Route endpoints are rounded to 4 decimal places (~11 m) so near-identical searches share cache entries
+ROUTE_COORD_PRECISION = 4
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def fetch_route(origin_lat, origin_lon, dest_lat, dest_lon, api_key_to_use):
+    """
+    Calls the Google Directions API for a route.
+    Returns (list of [longitude, latitude] pairs, travel_time_text), or None if no route exists.
+    Results are cached for a day; API and network errors raise instead, so they are never cached.
+    """
     base_url = "https://maps.googleapis.com/maps/api/directions/json"
     params = {
         "origin": f"{origin_lat},{origin_lon}",
         "destination": f"{dest_lat},{dest_lon}",
         "key": api_key_to_use
     }
-    try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
+    response = get_http_session().get(base_url, params=params, timeout=GOOGLE_API_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
 
-        if data["status"] == "OK" and data["routes"]:
-            polyline_str = data["routes"][0]["overview_polyline"]["points"]
-            
-            travel_time_text = data["routes"][0]["legs"][0]["duration"]["text"] # Get human-readable duration
+    if data["status"] == "OK" and data["routes"]:
+        polyline_str = data["routes"][0]["overview_polyline"]["points"]
+        
+        travel_time_text = data["routes"][0]["legs"][0]["duration"]["text"] # Get human-readable duration
 
-            # Use the robust `polyline` library to decode the string
-            decoded_polyline = polyline.decode(polyline_str)
-            # The library returns lat/lon pairs, so we need to convert to lon/lat for Pydeck
-            decoded_polyline_for_pydeck = [[lon, lat] for lat, lon in decoded_polyline]
+        # Use the robust `polyline` library to decode the string
+        decoded_polyline = polyline.decode(polyline_str)
+        # The library returns lat/lon pairs, so we need to convert to lon/lat for Pydeck
+        decoded_polyline_for_pydeck = [[lon, lat] for lat, lon in decoded_polyline]
 
-            return decoded_polyline_for_pydeck, travel_time_text
+        return decoded_polyline_for_pydeck, travel_time_text
+    elif data["status"] == "ZERO_RESULTS":
+        return None
+    else:
+        raise ValueError(f"{data['status']}. {data.get('error_message', '')}")
 
-        elif data["status"] == "ZERO_RESULTS":
-            st.warning("No route found between the specified locations. This might mean they are unreachable by road or too close.")
-            return None, None
-        else:
-            st.error(f"Error getting route from Directions API: {data['status']}. {data.get('error_message', '')} Please ensure the locations are valid and your API key has Directions API enabled.")
-            return None, None
+def get_route_details(origin_lat, origin_lon, dest_lat, dest_lon, api_key_to_use):
+    """
+    Gets route polyline and travel time between two points using Google Directions API.
+    Returns (list of [longitude, latitude] pairs, travel_time_text) or (None, None).
+    """
+    if not str(api_key_to_use).strip():
+        st.error("Google Maps API Key is not configured. Please set it in your Streamlit secrets as 'GOOGLE_MAPS_API_KEY'. **Also ensure the Directions API is enabled in your Google Cloud Project.**")
+        return None, None
+
+    try:
+        route = fetch_route(
+            round(origin_lat, ROUTE_COORD_PRECISION), round(origin_lon, ROUTE_COORD_PRECISION),
+            round(dest_lat, ROUTE_COORD_PRECISION), round(dest_lon, ROUTE_COORD_PRECISION),
+            api_key_to_use
+        )
     except requests.exceptions.RequestException as e:
         st.error(f"Network error or invalid API key for Directions API: {e}. Please check your internet connection and API key configuration.")
         return None, None
+    except ValueError as e:
+        st.error(f"Error getting route from Directions API: {e} Please ensure the locations are valid and your API key has Directions API enabled.")
+        return None, None
     except Exception as e:
         st.error(f"An unexpected error occurred during route calculation: {e}")
         return None, None
 
+    if route is None:
+        st.warning("No route found between the specified locations. This might mean they are unreachable by road or too close.")
+        return None, None
+    return route
+
 # --- Firestore Operations for Stores ---
 def add_store_to_db(name, address, latitude, longitude, contact_number, branch_supervisor, store_status, store_hours, store_type, google_pin_location):
     """Adds a new store to Firestore database."""
@@ -177,8 +288,8 @@ def add_store_to_db(name, address, latitude, longitude, contact_number, branch_s
         normalized_address = normalize_string(address)
         normalized_store_type = normalize_string(store_type) if store_type else None
 
-        # Check for existing store using normalized name and address
-        docs = db.collection('stores').where('normalized_name', '==', normalized_name).where('normalized_address', '==', normalized_address).stream()
+        # Check for existing store using normalized name and address (one match is enough)
+        docs = db.collection('stores').where('normalized_name', '==', normalized_name).where('normalized_address', '==', normalized_address).limit(1).stream()
         if any(docs):
             st.error(f"A store with the name '{name}' and address '{address}' (or a similar normalized form) already exists!")
             return False
@@ -201,7 +312,7 @@ def add_store_to_db(name, address, latitude, longitude, contact_number, branch_s
             'timestamp': firestore.SERVER_TIMESTAMP
         })
         st.success(f"Store '{name}' added successfully!")
-        st.cache_data.clear()
+        bump_data_version('stores')
         
         # After successful add, increment the counter and force a rerun to clear the form fields
         st.session_state.new_store_form_counter += 1
@@ -211,22 +322,140 @@ def add_store_to_db(name, address, latitude, longitude, contact_number, branch_s
         st.error(f"Error adding store to database: {e}")
         return False
 
-def update_store_in_db(store_id, name, address, latitude, longitude, contact_number, branch_supervisor, store_status, store_hours, store_type, google_pin_location):
-    """Updates an existing store in Firestore database."""
+# Firestore accepts at most 500 writes per batch
+FIRESTORE_BATCH_LIMIT = 500
+
+def add_stores_bulk(stores):
+    """Adds many stores to Firestore using batched writes (one commit per 500 stores).
+    `stores` is a list of dicts with the same fields as add_store_to_db; entries whose normalized
+    name and address already exist (in the database or earlier in the list) are skipped.
+    Returns the number of stores written."""
+    written = 0
+    try:
+        existing_stores = fetch_stores_from_db_local(get_data_versions()['stores'])
+        seen = set(zip(existing_stores['normalized_name'], existing_stores['normalized_address'])) if not existing_stores.empty else set()
+
+        new_docs = []
+        for store in stores:
+            normalized_key = (normalize_string(store['name']), normalize_string(store['address']))
+            if normalized_key in seen:
+                continue
+            seen.add(normalized_key)
+            store_type = store.get('store_type')
+            new_docs.append({
+                'name': store['name'],
+                'address': store['address'],
+                'latitude': store['latitude'],
+                'longitude': store['longitude'],
+                'contact_number': store.get('contact_number', ''),
+                'branch_supervisor': store.get('branch_supervisor', ''),
+                'store_status': store.get('store_status', 'Operational'),
+                'store_hours': store.get('store_hours', ''),
+                'store_type': store_type,
+                'google_pin_location': store.get('google_pin_location', ''),
+                'normalized_name': normalized_key[0],
+                'normalized_address': normalized_key[1],
+                'normalized_store_type': normalize_string(store_type) if store_type else None,
+                'timestamp': firestore.SERVER_TIMESTAMP
+            })
+
+        try:
+            for start in range(0, len(new_docs), FIRESTORE_BATCH_LIMIT):
+                batch_docs = new_docs[start:start + FIRESTORE_BATCH_LIMIT]
+                batch = db.batch()
+                for store_data in batch_docs:
+                    batch.set(db.collection('stores').document(), store_data)
+                batch.commit()
+                written += len(batch_docs)
+        finally:
+            # Batches committed before a failure stay written, so the cached stores must be refreshed either way
+            if written:
+                bump_data_version('stores')
+
+        skipped = len(stores) - len(new_docs)
+        st.success(f"Added {written} store(s)." + (f" Skipped {skipped} duplicate(s)." if skipped else ""))
+        return written
+    except Exception as e:
+        st.error(f"Error adding stores to database: {e}" + (f". {written} store(s) were added before the error." if written else ""))
+        return written
+
+# Columns a store CSV must have; like the Add Store form, a status and a type are required
+STORE_IMPORT_REQUIRED_COLUMNS = ['name', 'address', 'store_status', 'store_type']
+
+def import_stores_from_csv(csv_file, api_key_to_use):
+    """Reads stores from an uploaded CSV file, geocodes their addresses concurrently and adds them with add_stores_bulk.
+    Each row gets the Add Store form's checks (status and type must be one of the form's choices, matched ignoring case,
+    and contact number and store hours must match their formats), so imported stores can be edited and re-saved there.
+    Invalid rows and rows whose address can't be geocoded are skipped. Returns the number of stores written."""
+    try:
+        rows = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+    except Exception as e:
+        st.error(f"Could not read the CSV file: {e}")
+        return 0
+
+    rows.columns = rows.columns.str.strip().str.lower()
+    missing_columns = set(STORE_IMPORT_REQUIRED_COLUMNS) - set(rows.columns)
+    if missing_columns:
+        st.error(f"The CSV file is missing the required column(s): {', '.join(sorted(missing_columns))}.")
+        return 0
+    rows = rows.apply(lambda column: column.str.strip())
+
+    status_choices = {option.lower(): option for option in STORE_STATUS_OPTIONS[1:]}
+    type_choices = {option.lower(): option for option in STORE_TYPE_FORM_OPTIONS[1:]}
+    # Duplicates (repeated in the file or already saved) are dropped here so they cost no geocoding call;
+    # add_stores_bulk still checks again before writing
+    existing_stores = fetch_stores_from_db_local(get_data_versions()['stores'])
+    seen = set(zip(existing_stores['normalized_name'], existing_stores['normalized_address'])) if not existing_stores.empty else set()
+    valid_stores = []
+    duplicate_rows = 0
+    for row in rows.to_dict('records'):
+        store_status = status_choices.get(row['store_status'].lower())
+        store_type = type_choices.get(row['store_type'].lower())
+        if (not row['name'] or not row['address'] or store_status is None or store_type is None
+                or (row.get('contact_number') and not CONTACT_NUMBER_RE.match(row['contact_number']))
+                or (row.get('store_hours') and not STORE_HOURS_RE.match(row['store_hours']))):
+            continue
+        normalized_key = (normalize_string(row['name']), normalize_string(row['address']))
+        if normalized_key in seen:
+            duplicate_rows += 1
+            continue
+        seen.add(normalized_key)
+        store = {column: row[column] for column in OPTIONAL_STORE_TEXT_COLUMNS if row.get(column)}
+        store.update({'name': row['name'], 'address': row['address'], 'store_status': store_status, 'store_type': store_type})
+        valid_stores.append(store)
+
+    invalid_rows = len(rows) - len(valid_stores) - duplicate_rows
+    if invalid_rows:
+        st.warning(f"Skipped {invalid_rows} row(s) that the Add Store form would reject (missing name or address, unknown status or type, or an invalid contact number or store hours format).")
+    if duplicate_rows:
+        st.warning(f"Skipped {duplicate_rows} row(s) for stores that are repeated in the file or already exist.")
+    if not valid_stores:
+        st.error("No new, valid store rows were found in the CSV file.")
+        return 0
+
+    # All addresses are geocoded in parallel over the shared session, then written in batches
+    coordinates = batch_geocode([store['address'] for store in valid_stores], api_key_to_use)
+    stores = []
+    for store, (lat, lon) in zip(valid_stores, coordinates):
+        if lat is None or lon is None:
+            continue
+        store.update({'latitude': lat, 'longitude': lon})
+        stores.append(store)
+
+    not_geocoded = len(valid_stores) - len(stores)
+    if not_geocoded:
+        st.warning(f"Skipped {not_geocoded} row(s) whose address could not be geocoded.")
+    return add_stores_bulk(stores) if stores else 0
+
+def update_store_in_db(store_id, name, address, latitude, longitude, contact_number, branch_supervisor, store_status, store_hours, store_type, google_pin_location, current_details=None):
+    """Updates an existing store in Firestore database.
+    If `current_details` (the store's cached record) is given, only the fields that differ from it are written."""
     try:
         normalized_name = normalize_string(name)
         normalized_address = normalize_string(address)
         normalized_store_type = normalize_string(store_type) if store_type else None
 
-        # Check for duplicates, excluding the current store being updated
-        docs = db.collection('stores').where('normalized_name', '==', normalized_name).where('normalized_address', '==', normalized_address).stream()
-        for doc in docs:
-            if doc.id != store_id:
-                st.error(f"An updated store with the name '{name}' and address '{address}' (or a similar normalized form) already exists for another entry!")
-                return False
-
-        doc_ref = db.collection('stores').document(store_id)
-        doc_ref.update({
+        store_data = {
             'name': name,
             'address': address,
             'latitude': latitude,
@@ -240,9 +469,28 @@ def update_store_in_db(store_id, name, address, latitude, longitude, contact_num
             'normalized_name': normalized_name,
             'normalized_address': normalized_address,
             'normalized_store_type': normalized_store_type,
-        })
+        }
+        if current_details is not None:
+            # None, NaN and '' all count as blank, so a cleared optional field isn't rewritten
+            def comparable(value):
+                return '' if value is None or (isinstance(value, float) and pd.isna(value)) else value
+            store_data = {field: value for field, value in store_data.items() if comparable(value) != comparable(current_details.get(field))}
+            if not store_data:
+                st.info(f"No changes to save for store '{name}'.")
+                return True
+
+        # Check for duplicates, excluding the current store being updated (at most itself plus one other need be read).
+        # Only needed when the normalized name or address actually changes.
+        if current_details is None or 'normalized_name' in store_data or 'normalized_address' in store_data:
+            docs = db.collection('stores').where('normalized_name', '==', normalized_name).where('normalized_address', '==', normalized_address).limit(2).stream()
+            for doc in docs:
+                if doc.id != store_id:
+                    st.error(f"An updated store with the name '{name}' and address '{address}' (or a similar normalized form) already exists for another entry!")
+                    return False
+
+        db.collection('stores').document(store_id).update(store_data)
         st.success(f"Store '{name}' (ID: {store_id}) updated successfully!")
-        st.cache_data.clear()
+        bump_data_version('stores')
         return True
     except Exception as e:
         st.error(f"Error updating store in database: {e}")
@@ -253,12 +501,35 @@ def delete_store_from_db(store_id):
     try:
         db.collection('stores').document(store_id).delete()
         st.success(f"Store with ID {store_id} deleted successfully!")
-        st.cache_data.clear()
+        bump_data_version('stores')
         return True
     except Exception as e:
         st.error(f"Error deleting store from database: {e}")
         return False
 
+def delete_stores_bulk(store_ids):
+    """Deletes many stores from Firestore using batched writes (one commit per 500 stores).
+    Returns the number of stores deleted."""
+    deleted = 0
+    try:
+        for start in range(0, len(store_ids), FIRESTORE_BATCH_LIMIT):
+            batch_ids = store_ids[start:start + FIRESTORE_BATCH_LIMIT]
+            batch = db.batch()
+            for store_id in batch_ids:
+                batch.delete(db.collection('stores').document(store_id))
+            batch.commit()
+            deleted += len(batch_ids)
+
+        st.success(f"Deleted {deleted} store(s).")
+        return deleted
+    except Exception as e:
+        st.error(f"Error deleting stores from database: {e}" + (f". {deleted} store(s) were deleted before the error." if deleted else ""))
+        return deleted
+    finally:
+        # Batches committed before a failure stay deleted, so the cached stores must be refreshed either way
+        if deleted:
+            bump_data_version('stores')
+
 # --- Firestore Operations for Delivery Fees ---
 def add_delivery_fee_to_db(location, min_order_amount, delivery_charge, amount_for_free_delivery, zone):
     """Adds a new delivery fee entry to Firestore database."""
@@ -266,8 +537,8 @@ def add_delivery_fee_to_db(location, min_order_amount, delivery_charge, amount_f
         normalized_location = normalize_string(location)
         normalized_zone = normalize_string(zone) if zone else '' # Handle optional zone, normalize even if empty
 
-        # Check for existing entry using normalized location and zone
-        docs = db.collection('delivery_fees').where('normalized_location', '==', normalized_location).where('normalized_zone', '==', normalized_zone).stream()
+        # Check for existing entry using normalized location and zone (one match is enough)
+        docs = db.collection('delivery_fees').where('normalized_location', '==', normalized_location).where('normalized_zone', '==', normalized_zone).limit(1).stream()
         if any(docs):
             st.error(f"Duplicate record: A delivery fee entry for '{location}' in zone '{zone}' (or a similar normalized form) already exists!")
             return False
@@ -284,7 +555,7 @@ def add_delivery_fee_to_db(location, min_order_amount, delivery_charge, amount_f
             'timestamp': firestore.SERVER_TIMESTAMP
         })
         st.success(f"Delivery fee for '{location}' added successfully!")
-        st.cache_data.clear()
+        bump_data_version('delivery_fees')
         st.rerun()
         return True
     except Exception as e:
@@ -297,8 +568,8 @@ def update_delivery_fee_in_db(fee_id, location, min_order_amount, delivery_charg
         normalized_location = normalize_string(location)
         normalized_zone = normalize_string(zone) if zone else '' # Handle optional zone, normalize even if empty
 
-        # Check for duplicates, excluding the current fee being updated
-        docs = db.collection('delivery_fees').where('normalized_location', '==', normalized_location).where('normalized_zone', '==', normalized_zone).stream()
+        # Check for duplicates, excluding the current fee being updated (at most itself plus one other need be read)
+        docs = db.collection('delivery_fees').where('normalized_location', '==', normalized_location).where('normalized_zone', '==', normalized_zone).limit(2).stream()
         for doc in docs:
             if doc.id != fee_id:
                 st.error(f"Duplicate record: An updated delivery fee entry for '{location}' in zone '{zone}' (or a similar normalized form) already exists for another entry!")
@@ -315,7 +586,7 @@ def update_delivery_fee_in_db(fee_id, location, min_order_amount, delivery_charg
             'normalized_zone': normalized_zone,
         })
         st.success(f"Delivery fee for '{location}' (ID: {fee_id}) updated successfully!")
-        st.cache_data.clear()
+        bump_data_version('delivery_fees')
         return True
     except Exception as e:
         st.error(f"Error updating delivery fee in database: {e}")
@@ -326,18 +597,68 @@ def delete_delivery_fee_from_db(fee_id):
     try:
         db.collection('delivery_fees').document(fee_id).delete()
         st.success(f"Delivery fee entry with ID {fee_id} deleted successfully!")
-        st.cache_data.clear()
+        bump_data_version('delivery_fees')
         return True
     except Exception as e:
         st.error(f"Error deleting delivery fee from database: {e}")
         return False
 
+def delete_delivery_fees_bulk(fee_ids):
+    """Deletes many delivery fee entries from Firestore using batched writes (one commit per 500 entries).
+    Returns the number of entries deleted."""
+    deleted = 0
+    try:
+        for start in range(0, len(fee_ids), FIRESTORE_BATCH_LIMIT):
+            batch_ids = fee_ids[start:start + FIRESTORE_BATCH_LIMIT]
+            batch = db.batch()
+            for fee_id in batch_ids:
+                batch.delete(db.collection('delivery_fees').document(fee_id))
+            batch.commit()
+            deleted += len(batch_ids)
+
+        st.success(f"Deleted {deleted} delivery fee entr{'y' if deleted == 1 else 'ies'}.")
+        return deleted
+    except Exception as e:
+        st.error(f"Error deleting delivery fees from database: {e}" + (f". {deleted} entr{'y was' if deleted == 1 else 'ies were'} deleted before the error." if deleted else ""))
+        return deleted
+    finally:
+        # Batches committed before a failure stay deleted, so the cached fees must be refreshed either way
+        if deleted:
+            bump_data_version('delivery_fees')
+
+# --- Data Versions ---
+@st.cache_resource
+def get_data_versions_state():
+    """Process-wide write counters shared by all sessions, with the lock that guards bumping them."""
+    return {'stores': 0, 'delivery_fees': 0}, threading.Lock()
+
+def get_data_versions():
+    """Process-wide write counters, shared by all sessions. Cached helpers take the
+    current version as an argument so a write in any session invalidates them."""
+    return get_data_versions_state()[0]
+
+def bump_data_version(collection_name):
+    """Marks a collection as changed after a successful write."""
+    versions, lock = get_data_versions_state()
+    # Sessions run in separate threads; without the lock two concurrent writes could both read the
+    # same version and leave one of them hidden behind a frame cached before it
+    with lock:
+        versions[collection_name] += 1
+
 # --- Caching Functions (Updated for Firestore) ---
-@st.cache_data(ttl=3600) # Cache for 1 hour, or until inputs change (e.g., a function is called with new data)
-def fetch_stores_from_db_local():
-    """Fetches all stores from Firestore and returns a DataFrame."""
+# Optional store fields that may be missing or null in Firestore documents
+OPTIONAL_STORE_TEXT_COLUMNS = ['contact_number', 'branch_supervisor', 'store_status', 'store_hours', 'store_type', 'google_pin_location']
+# Normalized search columns and the field each one is derived from
+NORMALIZED_STORE_COLUMNS = {'normalized_name': 'name', 'normalized_address': 'address', 'normalized_store_type': 'store_type'}
+# Fields the app reads from store documents; anything else stored on a document is never downloaded
+STORE_DOCUMENT_FIELDS = ['name', 'address', 'latitude', 'longitude', *OPTIONAL_STORE_TEXT_COLUMNS, 'timestamp', *NORMALIZED_STORE_COLUMNS]
+
+@st.cache_data(ttl=3600, max_entries=2) # Cache for 1 hour, or until the stores version changes
+def fetch_stores_from_db_local(stores_version):
+    """Fetches all stores from Firestore and returns a DataFrame.
+    `stores_version` is only used as part of the cache key, so store writes never clear unrelated caches."""
     try:
-        docs = db.collection('stores').stream()
+        docs = db.collection('stores').select(STORE_DOCUMENT_FIELDS).stream()
         stores_list = []
         for doc in docs:
             store_data = doc.to_dict()
@@ -348,24 +669,32 @@ def fetch_stores_from_db_local():
         if not df.empty:
             df = df.sort_values(by='timestamp', ascending=False)
             df['id'] = df['id'].astype(str) # Ensure ID is string for display
-            # Ensure 'google_pin_location' column exists, even if empty for older data
-            if 'google_pin_location' not in df.columns:
-                df['google_pin_location'] = ''
-            # Ensure normalized columns exist for backward compatibility
-            if 'normalized_name' not in df.columns:
-                df['normalized_name'] = df['name'].apply(normalize_string)
-            if 'normalized_address' not in df.columns:
-                df['normalized_address'] = df['address'].apply(normalize_string)
-            if 'normalized_store_type' not in df.columns:
-                df['normalized_store_type'] = df['store_type'].apply(lambda x: normalize_string(x) if x else None)
+            # Coordinates feed the vectorized distance search; store them as plain float64 columns
+            # (documents may hold ints or strings) so the index build is a zero-copy view
+            for column in ['latitude', 'longitude']:
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+            # Fill the optional text fields once here (missing columns in older data included),
+            # so rendering and the edit form only ever see plain strings
+            existing_columns = set(df.columns)
+            for column in OPTIONAL_STORE_TEXT_COLUMNS:
+                if column not in existing_columns:
+                    df[column] = ''
+            df = df.fillna({column: '' for column in OPTIONAL_STORE_TEXT_COLUMNS})
+            # Ensure normalized columns exist for backward compatibility; only the missing ones are derived
+            for column in NORMALIZED_STORE_COLUMNS.keys() - existing_columns:
+                df[column] = df[NORMALIZED_STORE_COLUMNS[column]].map(lambda x: normalize_string(x) if x else None)
+            # Only a handful of store types exist, so a categorical column stores them once and the
+            # type filter and search compare codes instead of every row's string
+            df['normalized_store_type'] = df['normalized_store_type'].astype('category')
         return df
     except Exception as e:
         st.error(f"Error fetching stores from database: {e}")
         return pd.DataFrame(columns=['id', 'name', 'address', 'latitude', 'longitude', 'contact_number', 'branch_supervisor', 'store_status', 'store_hours', 'store_type', 'google_pin_location', 'normalized_name', 'normalized_address', 'normalized_store_type'])
 
-@st.cache_data(ttl=3600)
-def fetch_delivery_fees_from_db_local():
-    """Fetches all delivery fee entries from Firestore and returns a DataFrame."""
+@st.cache_data(ttl=3600, max_entries=2) # Cache for 1 hour, or until the delivery fees version changes
+def fetch_delivery_fees_from_db_local(delivery_fees_version):
+    """Fetches all delivery fee entries from Firestore and returns a DataFrame.
+    `delivery_fees_version` is only used as part of the cache key, like the stores fetch."""
     try:
         docs = db.collection('delivery_fees').stream()
         fees_list = []
@@ -378,20 +707,192 @@ def fetch_delivery_fees_from_db_local():
         if not df.empty:
             df = df.sort_values(by='timestamp', ascending=False)
             df['id'] = df['id'].astype(str) # Ensure ID is string for display
-            # Ensure normalized columns exist, even if they were not present in older documents
+            # Precompute the normalized search columns once per fetch, filling in any
+            # documents (or whole columns) written before normalization was added
             if 'normalized_location' not in df.columns:
-                df['normalized_location'] = df['location'].apply(normalize_string)
+                df['normalized_location'] = None
             if 'normalized_zone' not in df.columns:
-                df['normalized_zone'] = df['zone'].apply(lambda x: normalize_string(x) if x else '')
+                df['normalized_zone'] = None
+            missing_location = df['normalized_location'].isna()
+            df.loc[missing_location, 'normalized_location'] = df.loc[missing_location, 'location'].map(normalize_string)
+            missing_zone = df['normalized_zone'].isna()
+            df.loc[missing_zone, 'normalized_zone'] = df.loc[missing_zone, 'zone'].map(lambda x: normalize_string(x) if x else '')
+            # Display strings for the read-only fee table, formatted once per fetch rather than on every rerun
+            for column in ['min_order_amount', 'delivery_charge']:
+                df[f'{column}_fmt'] = df[column].map(lambda v: f"AED {v:.2f}")
+            df['amount_for_free_delivery_fmt'] = df['amount_for_free_delivery'].map(lambda v: f"AED {v:.2f}" if pd.notnull(v) and v > 0 else '-')
 
         return df
     except Exception as e:
         st.error(f"Error fetching delivery fees from database: {e}")
         return pd.DataFrame(columns=['id', 'location', 'min_order_amount', 'delivery_charge', 'amount_for_free_delivery', 'zone', 'normalized_location', 'normalized_zone'])
 
+@st.cache_resource(ttl=3600, max_entries=2) # Current and previous stores version only, like the stores fetch
+def get_stores_by_id(stores_version):
+    """Maps store id -> store record for the given stores version. Shared across
+    sessions, so callers must treat the returned dict as read-only."""
+    stores = fetch_stores_from_db_local(stores_version)
+    if stores.empty:
+        return {}
+    return stores.set_index('id', drop=False).to_dict('index')
+
+@st.cache_resource(ttl=3600, max_entries=2)
+def get_store_list_index(stores_version):
+    """Returns the stores sorted by name (blank optional fields shown as 'N/A') plus an
+    id -> "name - address" label dict for the Add/Edit list, built once per stores version.
+    Callers must treat both as read-only."""
+    stores = fetch_stores_from_db_local(stores_version)
+    if stores.empty:
+        return stores, {}
+    stores_sorted = stores.sort_values(by='name')
+    for column in ['contact_number', 'branch_supervisor', 'store_status', 'store_hours', 'google_pin_location']:
+        stores_sorted[column] = stores_sorted[column].where(stores_sorted[column].astype(str).str.strip() != '', 'N/A')
+    return stores_sorted, dict(zip(stores_sorted['id'], stores_sorted['name'] + " - " + stores_sorted['address']))
+
+# --- Map Building (Cached) ---
+@st.cache_resource(ttl=3600, max_entries=8) # Two stores versions x the four store type filters
+def get_store_index(stores_version, store_type):
+    """Builds a per-version index for the nearest-store lookup: the stores of the given type
+    and their coordinates as an (N, 3) array of unit vectors on the sphere.
+    `stores_version` is only used as part of the cache key."""
+    stores = fetch_stores_from_db_local(stores_version)
+    if store_type != "All Stores" and not stores.empty:
+        # Match on the normalized type so differences in case or spacing don't exclude stores
+        normalized_filter_type = normalize_string(store_type)
+        stores = stores[stores['normalized_store_type'] == normalized_filter_type]
+    if stores.empty:
+        return stores, np.empty((0, 3))
+
+    # Kept in float64 on purpose: ranking compares dot products that are all close to 1, and
+    # float32's ~6e-8 resolution there corresponds to ~2 km, enough to misorder nearby stores
+    lat_rad = np.radians(stores['latitude'].to_numpy())
+    lon_rad = np.radians(stores['longitude'].to_numpy())
+    return stores, lat_lon_to_unit_vectors(lat_rad, lon_rad)
+
+def lat_lon_to_unit_vectors(lat_rad, lon_rad):
+    """Converts radian coordinates to 3D unit vectors (x, y, z); works on scalars or arrays."""
+    cos_lat = np.cos(lat_rad)
+    return np.stack([cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)], axis=-1)
+
+@st.cache_resource(ttl=3600, max_entries=32) # Keyed on each search's coordinates, so only recent searches are kept
+def find_nearest_stores(stores_version, store_type, user_lat, user_lon, count=3):
+    """Returns the `count` stores of the given type closest to the user, sorted by a new 'distance_km' column.
+    Cached as a resource (no pickling of the result per call), so callers must not modify the returned DataFrame."""
+    stores, unit_vectors = get_store_index(stores_version, store_type)
+    if stores.empty:
+        return stores
+
+    # All of the user's trigonometry is folded into one unit vector. Great-circle distance falls
+    # as the dot product rises, so ranking needs only one matrix-vector product; no trig per store
+    user_vector = lat_lon_to_unit_vectors(radians(user_lat), radians(user_lon))
+    negative_dots = -(unit_vectors @ user_vector)
+    # Select the `count` best in O(N) with argpartition, then sort only those
+    nearest_positions = np.arange(len(negative_dots))
+    if len(negative_dots) > count:
+        nearest_positions = np.argpartition(negative_dots, count - 1)[:count]
+    nearest_positions = nearest_positions[np.argsort(negative_dots[nearest_positions])]
+
+    # Exact kilometres for the shown stores from the chord length c: distance = 2R * arcsin(c / 2),
+    # which equals the haversine result without going back through latitude/longitude
+    chord = np.linalg.norm(unit_vectors[nearest_positions] - user_vector, axis=1)
+    nearest_stores = stores.iloc[nearest_positions].copy()
+    nearest_stores['distance_km'] = 2 * 6371 * np.arcsin(np.minimum(chord / 2, 1.0))
+    return nearest_stores
+
+@st.cache_resource(ttl=3600, max_entries=32)
+def build_stores_map_df(stores_version, store_type, user_lat, user_lon):
+    """Builds the IconLayer DataFrame for the nearest stores, highlighting the closest one.
+    Callers must not modify the returned (shared) DataFrame."""
+    top_three_stores = find_nearest_stores(stores_version, store_type, user_lat, user_lon)
+    nearest_store = top_three_stores.iloc[0]
+    min_distance = nearest_store['distance_km']
+
+    # Column operations only (no per-row Python loop)
+    map_data = top_three_stores[['latitude', 'longitude', 'name', 'address', 'id']].rename(columns={'latitude': 'lat', 'longitude': 'lon'})
+    nearest_mask = map_data['id'] == nearest_store['id']
+    # The tooltip template renders these columns as raw HTML, so escape them once here
+    map_data['name'] = map_data['name'].map(html.escape)
+    map_data['address'] = map_data['address'].map(html.escape)
+    # Highlight the nearest store in red, the others in green
+    map_data['icon_data'] = np.where(nearest_mask, NEAREST_STORE_ICON, STORE_ICON)
+    # The tooltip is rendered from the name/address columns; only the nearest store
+    # carries the extra "Nearest:" prefix and distance line
+    map_data['label'] = np.where(nearest_mask, 'Nearest: ', '')
+    map_data['distance_note'] = np.where(nearest_mask, f'<br/>Distance: {min_distance:.2f} km', '')
+    return map_data
+
+@st.cache_resource(ttl=3600, max_entries=32)
+def build_deck(stores_version, store_type, user_lat, user_lon, user_address, route_paths):
+    """Builds the Pydeck map for a search. Cached as a resource so each unique
+    (stores version, search, routes) combination constructs its Deck only once."""
+    map_data = build_stores_map_df(stores_version, store_type, user_lat, user_lon)
+
+    # User's location is rendered as its own layer, so the store data is never copied
+    user_location_df = pd.DataFrame([{
+        'name': 'Your Location',
+        'address': html.escape(user_address),
+        'lat': user_lat,
+        'lon': user_lon,
+        'icon_data': USER_LOCATION_ICON,
+        'label': '',
+        'distance_note': ''
+    }])
+
+    view_state = pdk.ViewState(
+        latitude=user_lat,
+        longitude=user_lon,
+        zoom=12, # Increased zoom level
+        pitch=45,
+    )
+
+    layers = []
+
+    # Add Route Layer for each of the top 3 stores
+    for route_path in route_paths:
+        layers.append(pdk.Layer(
+            "PathLayer",
+            data=[{"path": [list(point) for point in route_path]}],
+            get_path="path",
+            get_color=[255, 255, 0],  # Yellow routes
+            width_min_pixels=6,
+            pickable=True,
+            auto_highlight=True
+        ))
+
+    # Add Icon Layers for Stores and User Location
+    layers.append(pdk.Layer(
+        "IconLayer",
+        data=map_data,
+        get_position="[lon, lat]",
+        get_icon="icon_data",
+        get_size=40, # This size interacts with the scale in icon_data
+        pickable=True
+    ))
+    layers.append(pdk.Layer(
+        "IconLayer",
+        data=user_location_df,
+        get_position="[lon, lat]",
+        get_icon="icon_data",
+        get_size=40,
+        pickable=True
+    ))
+
+    # Add tooltip and pickability
+    tooltip = {
+        "html": "{label}<b>{name}</b><br/>{address}{distance_note}",
+        "style": {"backgroundColor": "steelblue", "color": "white"}
+    }
+
+    return pdk.Deck(
+        map_style="mapbox://styles/mapbox/light-v10",
+        initial_view_state=view_state,
+        layers=layers,
+        tooltip=tooltip,
+    )
+
 # Call the cached functions to initialize session state DataFrames
-st.session_state.stores_df = fetch_stores_from_db_local()
-st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local()
+st.session_state.stores_df = fetch_stores_from_db_local(get_data_versions()['stores'])
+st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local(get_data_versions()['delivery_fees'])
 
 
 # Initialize Streamlit session state variables
@@ -399,8 +900,6 @@ if 'stores_df' not in st.session_state:
     st.session_state.stores_df = pd.DataFrame(columns=['id', 'name', 'address', 'latitude', 'longitude', 'contact_number', 'branch_supervisor', 'store_status', 'store_hours', 'store_type', 'google_pin_location', 'timestamp', 'normalized_name', 'normalized_address', 'normalized_store_type']) # Added new columns
 if 'editing_store_id' not in st.session_state:
     st.session_state.editing_store_id = None
-if 'editing_store_details' not in st.session_state:
-    st.session_state.editing_store_details = {}
 if 'new_store_form_counter' not in st.session_state: # New counter for form key for Add/Edit tab
     st.session_state.new_store_form_counter = 0
 
@@ -432,6 +931,8 @@ if 'store_search_type' not in st.session_state: # New session state for search t
     st.session_state.store_search_type = "All Stores"
 if 'store_results_search_query' not in st.session_state:
     st.session_state.store_results_search_query = ""
+if 'last_store_search' not in st.session_state: # Last geocoding/route results, reused while the search is unchanged
+    st.session_state.last_store_search = None
     
 
 if 'user_lat' not in st.session_state:
@@ -465,21 +966,22 @@ if 'fee_search_query' not in st.session_state:
 def set_edit_store_state(store_id):
     """Sets the session state to populate the store form for editing
     and forces the tab to switch to the Add/Edit tab."""
-    store_to_edit = st.session_state.stores_df[st.session_state.stores_df['id'] == store_id]
-    if not store_to_edit.empty:
+    # Only the id is kept in session state; the form looks the details up from the cached stores
+    if store_id in get_stores_by_id(get_data_versions()['stores']):
         st.session_state.editing_store_id = store_id
-        st.session_state.editing_store_details = store_to_edit.iloc[0].to_dict()
         # FIX: Set the tab state to "Add/Edit Stores" to force the switch
         st.session_state.selected_store_tab = "Add/Edit Stores"
         # Removed st.rerun() here as the state change triggers it.
     else:
         st.warning("No store found with that ID.")
 
-def delete_and_rerun_store(store_id):
-    """Deletes a store entry and re-fetches data."""
-    if delete_store_from_db(store_id):
-        st.session_state.stores_df = fetch_stores_from_db_local()
-        # Removed st.rerun() here as the state change triggers it.
+def delete_and_rerun_stores(store_ids):
+    """Deletes the given store entries in batches and re-fetches data once."""
+    if delete_stores_bulk(store_ids):
+        st.session_state.stores_df = fetch_stores_from_db_local(get_data_versions()['stores'])
+        # Don't leave the edit form pointing at a store that no longer exists
+        if st.session_state.editing_store_id in store_ids:
+            clear_store_edit_state()
 
 
 def set_edit_fee_state(fee_id):
@@ -494,18 +996,22 @@ def set_edit_fee_state(fee_id):
     else:
         st.warning("No delivery fee entry found with that ID.")
 
-def delete_and_rerun_fee(fee_id):
-    """Deletes a fee entry and reruns the app to refresh the table."""
-    if delete_delivery_fee_from_db(fee_id):
-        st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local()
-        # Removed st.rerun() here as the state change triggers it.
+def delete_and_rerun_fees(fee_ids):
+    """Deletes the given fee entries in batches and re-fetches data once."""
+    if delete_delivery_fees_bulk(fee_ids):
+        st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local(get_data_versions()['delivery_fees'])
+        # Don't leave the edit form pointing at an entry that no longer exists
+        if st.session_state.editing_delivery_fee_id in fee_ids:
+            clear_delivery_fee_edit_state()
 
 def clear_delivery_fee_edit_state():
     """Clears the session state for editing a delivery fee,
     keeping the user on the Add/Edit tab with a blank form."""
-    st.session_state.editing_delivery_fee_id = None
-    st.session_state.editing_delivery_fee_details = {}
-    st.session_state.selected_delivery_tab = "Add/Edit" # Stay on Add/Edit tab, with blank form
+    st.session_state.update({
+        'editing_delivery_fee_id': None,
+        'editing_delivery_fee_details': {},
+        'selected_delivery_tab': "Add/Edit", # Stay on Add/Edit tab, with blank form
+    })
     # Removed st.rerun() here as the state change triggers it.
 
 def clear_store_edit_state():
@@ -513,41 +1019,63 @@ def clear_store_edit_state():
     This is primarily for canceling an edit. It also increments the new store form counter
     to ensure the 'Add' form is fresh after a cancellation."""
     st.session_state.editing_store_id = None
-    st.session_state.editing_store_details = {}
     st.session_state.new_store_form_counter += 1 # Increment to ensure next 'Add' form is fresh
     # Removed st.rerun() here as the state change triggers it.
     
+def write_store_field(label, value):
+    """Writes a labelled store detail, showing 'N/A' for missing, NaN or blank values."""
+    text = '' if value is None else str(value).strip()
+    if not text or text.lower() == 'nan':
+        text = 'N/A'
+    st.write(f"**{label}:** {text}")
+
 def reset_price_calculator_inputs():
     """Resets all input fields on the price calculator page."""
-    st.session_state.selected_complexity = "--- Select a Complexity ---"
-    st.session_state.real_cake_size = 0.0
-    st.session_state.dummy_cake_size = 0.0
-    st.session_state.add_flavor_charge = False
-    st.session_state.selected_toy_complexity = "--- Select a Toy Complexity ---"
-    st.session_state.toy_quantity = 0
-    st.session_state.apply_discount = False
-    st.session_state.generate_report = False
+    st.session_state.update({
+        'selected_complexity': "--- Select a Complexity ---",
+        'real_cake_size': 0.0,
+        'dummy_cake_size': 0.0,
+        'add_flavor_charge': False,
+        'selected_toy_complexity': "--- Select a Toy Complexity ---",
+        'toy_quantity': 0,
+        'apply_discount': False,
+        'generate_report': False,
+    })
     
+@st.cache_resource
+def read_style_block(file_name):
+    """Reads a CSS file once per process and returns it minified and wrapped in a <style> tag.
+    The block itself still has to be emitted on every run, since Streamlit drops elements that are not re-rendered."""
+    with open(file_name) as f:
+        css = f.read()
+    # Strip comments and collapse whitespace to shrink the payload sent on each rerun
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
 # Load CSS from external file
 def load_css(file_name):
     try:
-        with open(file_name) as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+        st.markdown(read_style_block(file_name), unsafe_allow_html=True)
     except FileNotFoundError:
         st.error(f"Error: CSS file '{file_name}' not found. Please ensure style.css is in the same directory as app.py.")
 
 # Apply general styling from style.css
 try:
-    with open("style.css") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    st.markdown(read_style_block("style.css"), unsafe_allow_html=True)
 except FileNotFoundError:
     st.warning("`style.css` not found. Default Streamlit styles will be used.")
 
 # Add Google Fonts link for 'Inter'
 st.markdown('<link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap" rel="stylesheet">', unsafe_allow_html=True)
 
-st.markdown("<h1 class='main-header'>🧰🎂 Katrina Knowledge Base Tools</h1>", unsafe_allow_html=True) # Updated header with new icons
-st.markdown("<p class='subheader'>Your one stop shop Tools</p>", unsafe_allow_html=True)
+# Header and subheader are sent as a single markdown element
+st.markdown(
+    "<h1 class='main-header'>🧰🎂 Katrina Knowledge Base Tools</h1>" # Updated header with new icons
+    "<p class='subheader'>Your one stop shop Tools</p>",
+    unsafe_allow_html=True
+)
 
 # Retrieve API key from Streamlit secrets
 try:
@@ -582,8 +1110,14 @@ selected_page = st.sidebar.radio(
 # Define store types globally or at least consistently
 STORE_TYPES = ["All Stores", "Smart Seven", "KCC", "Other"]
 
+# Add/Edit store form choices, with option -> position lookups for preselecting the edited store's values
+STORE_STATUS_OPTIONS = ["--- Select Status ---", "Operational", "Temporarily Closed", "Permanently Closed"]
+STORE_STATUS_INDEX = {option: i for i, option in enumerate(STORE_STATUS_OPTIONS)}
+STORE_TYPE_FORM_OPTIONS = ["--- Select Type ---"] + STORE_TYPES[1:] # Exclude "All Stores"
+STORE_TYPE_FORM_INDEX = {option: i for i, option in enumerate(STORE_TYPE_FORM_OPTIONS)}
+
 if selected_page == "Find Store/Add/Edit":
-    st.session_state.stores_df = fetch_stores_from_db_local() # Always get latest from cache
+    st.session_state.stores_df = fetch_stores_from_db_local(get_data_versions()['stores']) # Always get latest from cache
     st.markdown("---")
     
     store_tab_options = ["Search Stores", "Add/Edit Stores"]
@@ -603,21 +1137,33 @@ if selected_page == "Find Store/Add/Edit":
     )
 
     if selected_store_tab == "Search Stores":
-        st.markdown("<div class='input-section'>", unsafe_allow_html=True)
-        st.markdown("<h3>Search Nearest Store</h3>", unsafe_allow_html=True)
-        st.write("Enter your location to find the nearest store.")
+        st.markdown(
+            "<div class='input-section'></div>"
+            "<h3>Search Nearest Store</h3>"
+            "<p>Enter your location to find the nearest store.</p>",
+            unsafe_allow_html=True
+        )
+
+        # Runs before the rerun the submit triggers, so that same run renders the results
+        # (updating the state after the form needed a second, explicit st.rerun())
+        def on_store_search_submit():
+            # Update the persistent search query and type
+            st.session_state.store_search_query = st.session_state.search_address_input_tab
+            st.session_state.store_search_type = st.session_state[f"store_type_filter_search_{st.session_state.search_form_counter}"]
+            st.session_state.store_search_input_display = "" # Clear the input field after submission
+            st.session_state.search_form_counter += 1 # Increment to force fresh form on next render
 
         # Wrap the input and button in a form so Enter key triggers submission
         with st.form("find_nearest_store_form_tab"):
             # Use session state for input value, controlled by the form submission
-            user_address_input = st.text_input(
+            st.text_input(
                 "Enter your Address (e.g., 'Burj Khalifa, Dubai')",
                 value=st.session_state.store_search_input_display,
                 key="search_address_input_tab"
             )
             
             # New dropdown for store type filter with dynamic key for state reset
-            selected_store_type_filter = st.selectbox(
+            st.selectbox(
                 "Filter by Store Type",
                 options=STORE_TYPES,
                 index=STORE_TYPES.index(st.session_state.store_search_type),
@@ -625,138 +1171,77 @@ if selected_page == "Find Store/Add/Edit":
             )
             
             # Only one button: "Find Nearest Store"
-            find_button = st.form_submit_button(
+            st.form_submit_button(
                 label="Find Nearest Store",
-                help="Click to find the store closest to your entered address."
+                help="Click to find the store closest to your entered address.",
+                on_click=on_store_search_submit
             )
 
-        # If the search button is clicked or a previous search query exists
-        if find_button:
-            # Update the persistent search query and type
-            st.session_state.store_search_query = user_address_input
-            st.session_state.store_search_type = selected_store_type_filter
-            st.session_state.store_search_input_display = "" # Clear the input field after submission
-            st.session_state.search_form_counter += 1 # Increment to force fresh form on next render
-            st.rerun() # Explicit rerun to ensure UI fully reflects new state
-        
         # Only proceed with map and results if a query has been submitted
         if st.session_state.store_search_query:
-            # Geocode user's location
-            st.session_state.user_lat, st.session_state.user_lon = get_coordinates_from_address(st.session_state.store_search_query, google_api_key)
+            stores_version = get_data_versions()['stores']
+            search_key = (stores_version, st.session_state.store_search_query, st.session_state.store_search_type)
+            last_search = st.session_state.last_store_search
+            if last_search and last_search['key'] == search_key:
+                # Rerun without a new search (e.g. another widget changed): reuse the last
+                # geocoding and route results instead of calling the Google APIs again
+                st.session_state.user_lat, st.session_state.user_lon = last_search['user_location']
+                route_details = last_search['route_details']
+                deck = last_search['deck']
+            else:
+                # Geocode user's location
+                st.session_state.user_lat, st.session_state.user_lon = get_coordinates_from_address(st.session_state.store_search_query, google_api_key)
+                route_details = None
 
             if st.session_state.user_lat and st.session_state.user_lon:
-                # Filter stores by type if not "All Stores"
-                filtered_stores = st.session_state.stores_df.copy()
-                if st.session_state.store_search_type != "All Stores":
-                    # FIX: Use normalized_store_type for filtering
-                    normalized_filter_type = normalize_string(st.session_state.store_search_type)
-                    filtered_stores = filtered_stores[filtered_stores['normalized_store_type'] == normalized_filter_type]
+                top_three_stores = find_nearest_stores(stores_version, st.session_state.store_search_type, st.session_state.user_lat, st.session_state.user_lon)
                 
-                if not filtered_stores.empty:
-                    # Calculate distance to all stores
-                    filtered_stores['distance_km'] = filtered_stores.apply(
-                        lambda row: haversine(st.session_state.user_lat, st.session_state.user_lon, row['latitude'], row['longitude']),
-                        axis=1
-                    )
-                    
-                    # Sort by distance and get the top 3 stores
-                    top_three_stores = filtered_stores.sort_values(by='distance_km').head(3)
-                    
+                if not top_three_stores.empty:
+                    if route_details is None:
+                        # Get route polyline and travel time for each store
+                        route_details = [
+                            get_route_details(st.session_state.user_lat, st.session_state.user_lon, store.latitude, store.longitude, google_api_key)
+                            for store in top_three_stores.itertuples(index=False)
+                        ]
+                        route_paths = tuple(
+                            tuple(tuple(point) for point in route_polyline)
+                            for route_polyline, _ in route_details
+                            if route_polyline and len(route_polyline) > 1
+                        )
+                        # The deck is only constructed once per unique search/route combination and
+                        # then reused as-is on reruns, so reruns for the same search do no map work at all
+                        deck = build_deck(stores_version, st.session_state.store_search_type, st.session_state.user_lat, st.session_state.user_lon, st.session_state.store_search_query, route_paths)
+                        # Only a fully routed search is reused, so failed Directions calls are retried on the next rerun
+                        # (like fetch_route, which never caches errors; genuine "no route" answers come from its cache)
+                        if all(travel_time_text for _, travel_time_text in route_details):
+                            st.session_state.last_store_search = {
+                                'key': search_key,
+                                'user_location': (st.session_state.user_lat, st.session_state.user_lon),
+                                'route_details': route_details,
+                                'deck': deck,
+                            }
+
                     st.subheader("Search Results")
                     
                     # Display details for each of the top 3 stores
-                    for index, nearest_store in top_three_stores.iterrows():
+                    for nearest_store, (route_polyline, travel_time_text) in zip(top_three_stores.itertuples(index=False), route_details):
                         st.markdown(f"---")
-                        st.info(f"**{nearest_store['name']}** in **{nearest_store['address']}**, approximately **{nearest_store['distance_km']:.2f} km** away.")
+                        st.info(f"**{nearest_store.name}** in **{nearest_store.address}**, approximately **{nearest_store.distance_km:.2f} km** away.")
 
-                        # Get route polyline and travel time
-                        route_polyline, travel_time_text = get_route_details(st.session_state.user_lat, st.session_state.user_lon, nearest_store['latitude'], nearest_store['longitude'], google_api_key)
-                        
                         if travel_time_text:
                             st.info(f"Estimated travel time: **{travel_time_text}**")
                         else:
                             st.warning("Could not retrieve route details (e.g., travel time). The locations might be too close or the Google Directions API had an issue.")
                         
-                        st.markdown("---")
-                        st.subheader(f"Details for {nearest_store['name']}")
-                        st.write(f"**Address:** {nearest_store['address']}")
-                        st.write(f"**Google PIN Location:** {nearest_store.get('google_pin_location', 'N/A')}")
-                        st.write(f"**Branch Supervisor:** {nearest_store.get('branch_supervisor', 'N/A')}")
-                        st.write(f"**Contact Number:** {nearest_store.get('contact_number', 'N/A')}")
-                        st.write(f"**Store Status:** {nearest_store.get('store_status', 'N/A')}")
-                        st.write(f"**Store Hours:** {nearest_store.get('store_hours', 'N/A')}")
-
-
-                    # Create a DataFrame for the map
-                    map_data = top_three_stores.rename(columns={'latitude': 'lat', 'longitude': 'lon'})
-                    map_data['icon_data'] = [
-                        {"path": "M12 2C8.13 2 5 5.13 5 9c0 5.25 7 13 7 13s7-7.75 7-13c0-3.87-3.13-7-7-7zm0 9.5c-1.38 0-2.5-1.12-2.5-2.5S10.62 6.5 12 6.5s2.5 1.12 2.5 2.5-1.12 2.5-2.5 2.5z", 
-                         "fill_color": [255, 0, 0] if i == 0 else [0, 128, 0], # Use index for highlighting the nearest
-                         "stroke_width": 0, "fill_opacity": 1.0, "scale": 100} # Increased scale
-                        for i, (index, row) in enumerate(map_data.iterrows())
-                    ]
-                    
-                    # Add user's location to the map data
-                    user_location_df = pd.DataFrame([{
-                        'name': 'Your Location',
-                        'address': st.session_state.store_search_query,
-                        'lat': st.session_state.user_lat,
-                        'lon': st.session_state.user_lon,
-                        'icon_data': {"path": "M20.94 11c-.46-4.17-3.37-7.6-7.14-9.35C13.43 1.25 12.72 1 12 1c-.72 0-1.43.25-1.8.65-3.77 1.75-6.68 5.18-7.14 9.35H2v2h2.06c.46 4.17 3.37 7.6 7.14 9.35.37.18.78.29 1.2.35V24h2v-1.65c.42-.06.83-.17 1.2-.35 3.77-1.75 6.68-5.18 7.14-9.35H22v-2h-1.06zm-8.88 9.35c-2.91-1.47-5.1-4.08-5.78-7.35h11.55c-.68 3.27-2.87 5.88-5.77 7.35z", "fill_color": [0, 0, 255], "stroke_width": 0, "fill_opacity": 1.0, "scale": 100} # Increased scale
-                    }])
-                    
-                    map_data = pd.concat([map_data, user_location_df], ignore_index=True)
+                        # Divider and details heading go out as one markdown element
+                        st.markdown(f"---\n### Details for {nearest_store.name}")
+                        write_store_field("Address", nearest_store.address)
+                        write_store_field("Google PIN Location", nearest_store.google_pin_location)
+                        write_store_field("Branch Supervisor", nearest_store.branch_supervisor)
+                        write_store_field("Contact Number", nearest_store.contact_number)
+                        write_store_field("Store Status", nearest_store.store_status)
+                        write_store_field("Store Hours", nearest_store.store_hours)
 
-                    # Create a pydeck map
-                    view_state = pdk.ViewState(
-                        latitude=st.session_state.user_lat,
-                        longitude=st.session_state.user_lon,
-                        zoom=12, # Increased zoom level
-                        pitch=45,
-                    )
-
-                    layers = []
-                    
-                    # Add Route Layer for each of the top 3 stores
-                    for index, store in top_three_stores.iterrows():
-                        route_polyline, _ = get_route_details(st.session_state.user_lat, st.session_state.user_lon, store['latitude'], store['longitude'], google_api_key)
-                        if route_polyline and len(route_polyline) > 1:
-                            route_layer = pdk.Layer(
-                                 "PathLayer",
-                                 data=[{"path": route_polyline}],
-                                 get_path="path",
-                                 get_color=[255, 255, 0],  # Yellow routes
-                                 width_min_pixels=6,
-                                 pickable=True,
-                                 auto_highlight=True
-                             )
-                            layers.append(route_layer)
-                             
-                    # Add Icon Layer for Stores and User Location
-                    icon_layer = pdk.Layer(
-                        "IconLayer",
-                        data=map_data,
-                        get_position="[lon, lat]",
-                        get_icon="icon_data",
-                        get_size=40, # This size interacts with the scale in icon_data
-                        pickable=True
-                    )
-                    
-                    # Add tooltip and pickability
-                    tooltip = {
-                        "html": "<b>{name}</b><br/>{address}",
-                        "style": {"backgroundColor": "steelblue", "color": "white"}
-                    }
-                    
-                    layers.append(icon_layer)
-                    
-                    # Create the Deckgl map
-                    deck = pdk.Deck(
-                        map_style="mapbox://styles/mapbox/light-v10",
-                        initial_view_state=view_state,
-                        layers=layers,
-                        tooltip=tooltip,
-                    )
                     st.pydeck_chart(deck)
                     
                 else:
@@ -767,8 +1252,7 @@ if selected_page == "Find Store/Add/Edit":
             st.info("Please enter a location and click 'Find Nearest Store' to begin your search.")
 
     elif selected_store_tab == "Add/Edit Stores":
-        st.markdown("<div class='input-section'>", unsafe_allow_html=True) # Added div for styling
-        st.markdown("<h3>Add/Edit Stores</h3>", unsafe_allow_html=True)
+        st.markdown("<div class='input-section'></div><h3>Add/Edit Stores</h3>", unsafe_allow_html=True) # Added div for styling
         st.info("To add or edit a store, please enter the required details below.")
 
         # Display the search bar
@@ -782,6 +1266,9 @@ if selected_page == "Find Store/Add/Edit":
         
         # Determine if we're in edit mode
         is_edit_mode = st.session_state.editing_store_id is not None
+        # Local snapshots for the form below: the record being edited ({} when adding) and the widget key suffix
+        editing_store_details = get_stores_by_id(get_data_versions()['stores']).get(st.session_state.editing_store_id, {}) if is_edit_mode else {}
+        key_suffix = f"{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}"
         
         # Use a unique key for the form that changes based on edit mode and ID
         # For new entries, use the new_store_form_counter to ensure key uniqueness after submission
@@ -792,40 +1279,33 @@ if selected_page == "Find Store/Add/Edit":
             st.markdown("<h4>{} Store</h4>".format("Edit" if is_edit_mode else "Add"), unsafe_allow_html=True)
             
             # Form inputs - ensure unique keys that change with editing_store_id or the form counter
-            # And crucially, set value explicitly to '' if not in edit mode
-            name = st.text_input("Store Name", value=st.session_state.editing_store_details.get('name', '') if is_edit_mode else '', key=f"store_name_input_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
-            address = st.text_input("Address", value=st.session_state.editing_store_details.get('address', '') if is_edit_mode else '', key=f"store_address_input_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
-            contact_number = st.text_input("Contact Number (e.g., +971 50 123 4567)", value=st.session_state.editing_store_details.get('contact_number', '') if is_edit_mode else '', key=f"contact_number_input_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
-            branch_supervisor = st.text_input("Branch Supervisor", value=st.session_state.editing_store_details.get('branch_supervisor', '') if is_edit_mode else '', key=f"branch_supervisor_input_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
+            # And crucially, values are '' if not in edit mode (editing_store_details is empty then)
+            name = st.text_input("Store Name", value=editing_store_details.get('name', ''), key=f"store_name_input_{key_suffix}")
+            address = st.text_input("Address", value=editing_store_details.get('address', ''), key=f"store_address_input_{key_suffix}")
+            contact_number = st.text_input("Contact Number (e.g., +971 50 123 4567)", value=editing_store_details.get('contact_number', ''), key=f"contact_number_input_{key_suffix}")
+            branch_supervisor = st.text_input("Branch Supervisor", value=editing_store_details.get('branch_supervisor', ''), key=f"branch_supervisor_input_{key_suffix}")
             
             # For selectbox, similar logic to set index
-            store_status_options = ["--- Select Status ---", "Operational", "Temporarily Closed", "Permanently Closed"]
-            if is_edit_mode and st.session_state.editing_store_details.get('store_status') in store_status_options:
-                current_store_status_index = store_status_options.index(st.session_state.editing_store_details.get('store_status'))
-            else:
-                current_store_status_index = 0 # Default to "--- Select Status ---" for new entries
-            store_status = st.selectbox("Store Status", store_status_options, index=current_store_status_index, key=f"store_status_select_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
+            # Defaults to "--- Select Status ---" for new entries or unknown values
+            current_store_status_index = STORE_STATUS_INDEX.get(editing_store_details.get('store_status'), 0)
+            store_status = st.selectbox("Store Status", STORE_STATUS_OPTIONS, index=current_store_status_index, key=f"store_status_select_{key_suffix}")
             
-            store_hours = st.text_input("Store Hours (e.g., 9 AM - 10 PM)", value=st.session_state.editing_store_details.get('store_hours', '') if is_edit_mode else '', key=f"store_hours_input_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
+            store_hours = st.text_input("Store Hours (e.g., 9 AM - 10 PM)", value=editing_store_details.get('store_hours', ''), key=f"store_hours_input_{key_suffix}")
             
             # New field for store type
-            store_type_options_with_select = ["--- Select Type ---"] + STORE_TYPES[1:] # Exclude "All Stores"
-            if is_edit_mode and st.session_state.editing_store_details.get('store_type') in store_type_options_with_select:
-                current_store_type_index = store_type_options_with_select.index(st.session_state.editing_store_details.get('store_type'))
-            else:
-                current_store_type_index = 0 # Default to "--- Select Type ---" for new entries
-            
-            store_type = st.selectbox("Store Type", options=store_type_options_with_select, index=current_store_type_index, key=f"store_type_select_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
+            # Defaults to "--- Select Type ---" for new entries or unknown values
+            current_store_type_index = STORE_TYPE_FORM_INDEX.get(editing_store_details.get('store_type'), 0)
+            store_type = st.selectbox("Store Type", options=STORE_TYPE_FORM_OPTIONS, index=current_store_type_index, key=f"store_type_select_{key_suffix}")
             
             # NEW FIELD FOR GOOGLE PIN LOCATION
-            google_pin_location = st.text_input("Google PIN Location (e.g., plus code or name)", value=st.session_state.editing_store_details.get('google_pin_location', '') if is_edit_mode else '', key=f"google_pin_input_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
+            google_pin_location = st.text_input("Google PIN Location (e.g., plus code or name)", value=editing_store_details.get('google_pin_location', ''), key=f"google_pin_input_{key_suffix}")
 
             # New PIN field for security
             if is_edit_mode:
                 pin_label = "Enter PIN to update"
             else:
                 pin_label = "Enter PIN to add"
-            user_pin = st.text_input(pin_label, type="password", key=f"pin_input_{st.session_state.editing_store_id}_{st.session_state.new_store_form_counter}")
+            user_pin = st.text_input(pin_label, type="password", key=f"pin_input_{key_suffix}")
 
             # Form submission buttons - arranged in columns
             col1, col2 = st.columns(2)
@@ -846,32 +1326,56 @@ if selected_page == "Find Store/Add/Edit":
                     st.error("Please select a valid Store Status.")
                 elif not is_edit_mode and store_type == "--- Select Type ---":
                     st.error("Please select a valid Store Type.")
-                elif contact_number and not re.match(CONTACT_NUMBER_PATTERN, contact_number):
+                elif contact_number and not CONTACT_NUMBER_RE.match(contact_number):
                     st.error("Invalid contact number format. Please use a valid international format.")
-                elif store_hours and not re.match(STORE_HOURS_PATTERN, store_hours):
+                elif store_hours and not STORE_HOURS_RE.match(store_hours):
                     st.error("Invalid store hours format. Please use a format like '9 AM - 10 PM' or '9:00 - 22:00'.")
                 else:
-                    lat, lon = get_coordinates_from_address(address, google_api_key)
+                    # Keep the stored coordinates when an edit leaves the address unchanged apart from case/spacing
+                    if (is_edit_mode and normalize_geocode_address(address) == normalize_geocode_address(editing_store_details.get('address', ''))
+                            and pd.notnull(editing_store_details.get('latitude')) and pd.notnull(editing_store_details.get('longitude'))):
+                        lat, lon = editing_store_details['latitude'], editing_store_details['longitude']
+                    else:
+                        lat, lon = get_coordinates_from_address(address, google_api_key, persist=True)
                     if lat and lon:
                         # If in edit mode, ensure '--- Select Status ---' is not saved as actual status
                         final_store_status = None if store_status == "--- Select Status ---" else store_status
                         final_store_type = None if store_type == "--- Select Type ---" else store_type
 
                         if is_edit_mode:
-                            if update_store_in_db(st.session_state.editing_store_id, name, address, lat, lon, contact_number, branch_supervisor, final_store_status, store_hours, final_store_type, google_pin_location):
+                            if update_store_in_db(st.session_state.editing_store_id, name, address, lat, lon, contact_number, branch_supervisor, final_store_status, store_hours, final_store_type, google_pin_location, current_details=editing_store_details):
                                 clear_store_edit_state() 
                         else:
                             # add_store_to_db now handles incrementing the counter and rerunning
                             add_store_to_db(name, address, lat, lon, contact_number, branch_supervisor, final_store_status, store_hours, final_store_type, google_pin_location)
                             
-        st.markdown("---")
-        st.markdown("<h4>Existing Stores</h4>", unsafe_allow_html=True)
+        # Bulk import: one concurrent geocoding pass and batched writes for the whole file
+        with st.form("import_stores_form", clear_on_submit=True):
+            st.markdown("<h4>Import Stores from CSV</h4>", unsafe_allow_html=True)
+            st.caption("Required columns: " + ", ".join(STORE_IMPORT_REQUIRED_COLUMNS) + ". Optional: "
+                       + ", ".join(column for column in OPTIONAL_STORE_TEXT_COLUMNS if column not in STORE_IMPORT_REQUIRED_COLUMNS) + ".")
+            stores_csv = st.file_uploader("CSV file", type="csv", key="import_stores_file")
+            import_pin = st.text_input("Enter PIN to import", type="password", key="pin_input_import")
+            import_button = st.form_submit_button(label="Import Stores")
+
+            if import_button:
+                if import_pin != SECURITY_PIN:
+                    st.error("Incorrect PIN. No stores were imported.")
+                elif stores_csv is None:
+                    st.error("Please choose a CSV file to import.")
+                elif import_stores_from_csv(stores_csv, google_api_key):
+                    st.session_state.stores_df = fetch_stores_from_db_local(get_data_versions()['stores'])
+
+        st.markdown("<hr/><h4>Existing Stores</h4>", unsafe_allow_html=True)
         
         # Display existing stores with edit/delete buttons
         if not st.session_state.stores_df.empty:
             
+            # Sorting and labels are precomputed per stores version; filtering keeps the name order
+            stores_df_sorted, store_labels = get_store_list_index(get_data_versions()['stores'])
+
             # --- New Filtering Logic ---
-            filtered_df = st.session_state.stores_df
+            filtered_df = stores_df_sorted
             if st.session_state.store_results_search_query:
                 normalized_query = normalize_string(st.session_state.store_results_search_query)
                 filtered_df = filtered_df[
@@ -881,51 +1385,62 @@ if selected_page == "Find Store/Add/Edit":
                 ]
 
             if not filtered_df.empty:
-                stores_df_sorted = filtered_df.sort_values(by='name')
-                
-                # Adjusted columns to include the new field
-                header_cols = st.columns([0.5, 1.5, 2, 1.5, 1.5, 1, 1, 1, 1.5])
-                with header_cols[0]: st.markdown("<strong>ID</strong>", unsafe_allow_html=True)
-                with header_cols[1]: st.markdown("<strong>Name</strong>", unsafe_allow_html=True)
-                with header_cols[2]: st.markdown("<strong>Address</strong>", unsafe_allow_html=True)
-                with header_cols[3]: st.markdown("<strong>Contact</strong>", unsafe_allow_html=True)
-                with header_cols[4]: st.markdown("<strong>Supervisor</strong>", unsafe_allow_html=True)
-                with header_cols[5]: st.markdown("<strong>Status</strong>", unsafe_allow_html=True)
-                with header_cols[6]: st.markdown("<strong>Hours</strong>", unsafe_allow_html=True)
-                with header_cols[7]: st.markdown("<strong>PIN</strong>", unsafe_allow_html=True)
-                with header_cols[8]: st.markdown("<strong>Actions</strong>", unsafe_allow_html=True)
-                st.markdown("---")
-
-                for index, row in stores_df_sorted.iterrows():
-                    # Adjusted columns to include the new field
-                    row_cols = st.columns([0.5, 1.5, 2, 1.5, 1.5, 1, 1, 1, 1.5])
-                    with row_cols[0]: st.write(row['id'])
-                    with row_cols[1]: st.write(row['name'])
-                    with row_cols[2]: st.write(row['address'])
-                    with row_cols[3]: st.write(row['contact_number'] if row['contact_number'] else '-')
-                    with row_cols[4]: st.write(row['branch_supervisor'] if row['branch_supervisor'] else '-')
-                    with row_cols[5]: st.write(row['store_status'] if row['store_status'] else '-')
-                    with row_cols[6]: st.write(row['store_hours'] if row['store_hours'] else '-')
-                    with row_cols[7]: st.write(row['google_pin_location'] if 'google_pin_location' in row and row['google_pin_location'] else '-')
-                    with row_cols[8]:
-                        edit_button_col, delete_button_col = st.columns(2)
-                        with edit_button_col:
-                            st.button(
-                                "✏️", 
-                                key=f"edit_store_add_edit_{row['id']}", # Unique key for this tab's button
-                                help="Edit this store",
-                                on_click=set_edit_store_state,
-                                args=(row['id'],)
-                            )
-                        with delete_button_col:
-                            # Removed the modal logic. Now directly calls delete_and_rerun_store
-                            st.button(
-                                "🗑️", 
-                                key=f"delete_store_add_edit_{row['id']}", # Unique key for this tab's button
-                                help="Delete this store",
-                                on_click=delete_and_rerun_store,
-                                args=(row['id'],)
-                            )
+                # Only one page of stores is serialized into the editor on each rerun, however many stores exist
+                page_count = (len(filtered_df) + STORE_LIST_PAGE_SIZE - 1) // STORE_LIST_PAGE_SIZE
+                page = 1
+                if page_count > 1:
+                    # The key includes the page count so the selection resets when a search changes it
+                    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1, key=f"store_list_page_{page_count}")
+                page_df = filtered_df.iloc[(page - 1) * STORE_LIST_PAGE_SIZE:page * STORE_LIST_PAGE_SIZE]
+
+                # A single editor payload instead of a row of widgets per store; only the delete column is editable.
+                # Checked rows are tracked by position, so the key resets them whenever the listed rows change
+                edited_df = st.data_editor(
+                    page_df[['id', 'name', 'address', 'latitude', 'longitude', 'contact_number', 'branch_supervisor', 'store_status', 'store_hours', 'google_pin_location']].assign(delete=False),
+                    hide_index=True,
+                    width="stretch",
+                    disabled=['id', 'name', 'address', 'latitude', 'longitude', 'contact_number', 'branch_supervisor', 'store_status', 'store_hours', 'google_pin_location'],
+                    key=f"store_list_editor_{get_data_versions()['stores']}_{page}_{st.session_state.store_results_search_query}",
+                    column_config={
+                        'delete': st.column_config.CheckboxColumn("Delete?"),
+                        'id': "ID",
+                        'name': "Name",
+                        'address': "Address",
+                        # Rounded for display by the grid itself, no per-rerun copy of the columns
+                        'latitude': st.column_config.NumberColumn("Latitude", format="%.4f"),
+                        'longitude': st.column_config.NumberColumn("Longitude", format="%.4f"),
+                        'contact_number': "Contact",
+                        'branch_supervisor': "Supervisor",
+                        'store_status': "Status",
+                        'store_hours': "Hours",
+                        'google_pin_location': "PIN",
+                    }
+                )
+                stores_to_delete = edited_df.loc[edited_df['delete'], 'id'].tolist()
+                st.button(
+                    f"🗑️ Delete Checked Stores ({len(stores_to_delete)})",
+                    key="delete_checked_stores",
+                    help="Delete every store checked in the table above",
+                    disabled=not stores_to_delete,
+                    on_click=delete_and_rerun_stores,
+                    args=(stores_to_delete,)
+                )
+
+                # Edit acts on one selected store, so the widget count does not grow with the number of stores;
+                # deleting goes through the checkboxes above
+                selected_store_id = st.selectbox(
+                    "Select a store to edit:",
+                    options=page_df['id'].tolist(),
+                    format_func=store_labels.get,
+                    key="store_action_select"
+                )
+                st.button(
+                    "✏️ Edit Store",
+                    key="edit_store_add_edit",
+                    help="Edit the selected store",
+                    on_click=set_edit_store_state,
+                    args=(selected_store_id,)
+                )
                 st.markdown("---")
             else:
                 st.info("No stores found matching your search criteria. Please try a different search term.")
@@ -937,7 +1452,7 @@ if selected_page == "Find Store/Add/Edit":
 elif selected_page == "Delivery Fee":
     # Ensure this is called at the very beginning of the Delivery Fee section
     # to get the freshest data BEFORE any operations or rendering.
-    st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local()
+    st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local(get_data_versions()['delivery_fees'])
     st.markdown("---")
     
     delivery_tab_options = ["Search/View", "Add/Edit"]
@@ -979,8 +1494,8 @@ elif selected_page == "Delivery Fee":
         if search_query:
             normalized_query = normalize_string(search_query)
             filtered_df = st.session_state.delivery_fees_df[
-                st.session_state.delivery_fees_df['normalized_location'].str.contains(normalized_query, na=False) |
-                st.session_state.delivery_fees_df['normalized_zone'].str.contains(normalized_query, na=False)
+                st.session_state.delivery_fees_df['normalized_location'].str.contains(normalized_query, regex=False, na=False) |
+                st.session_state.delivery_fees_df['normalized_zone'].str.contains(normalized_query, regex=False, na=False)
             ]
         else:
             filtered_df = st.session_state.delivery_fees_df
@@ -988,26 +1503,30 @@ elif selected_page == "Delivery Fee":
         if not filtered_df.empty:
             filtered_df = filtered_df.sort_values(by='location')
 
-            st.markdown("---")
-            # Removed the "Actions" header and the edit button from this view
-            header_cols = st.columns([0.5, 2, 1.5, 1.5, 1.5, 1.5]) 
-            with header_cols[0]: st.markdown("<strong>ID</strong>", unsafe_allow_html=True)
-            with header_cols[1]: st.markdown("<strong>Location</strong>", unsafe_allow_html=True)
-            with header_cols[2]: st.markdown("<strong>Zone</strong>", unsafe_allow_html=True)
-            with header_cols[3]: st.markdown("<strong>Min Order (AED)</strong>", unsafe_allow_html=True)
-            with header_cols[4]: st.markdown("<strong>Charge (AED)</strong>", unsafe_allow_html=True)
-            with header_cols[5]: st.markdown("<strong>Free At (AED)</strong>", unsafe_allow_html=True)
-            st.markdown("---")
-            
-            for index, row in filtered_df.iterrows():
-                # Removed the "Actions" column content
-                row_cols = st.columns([0.5, 2, 1.5, 1.5, 1.5, 1.5]) 
-                with row_cols[0]: st.write(row['id'])
-                with row_cols[1]: st.write(row['location'])
-                with row_cols[2]: st.write(row['zone'] if row['zone'] else '-')
-                with row_cols[3]: st.write(f"AED {row['min_order_amount']:.2f}")
-                with row_cols[4]: st.write(f"AED {row['delivery_charge']:.2f}")
-                with row_cols[5]: st.write(f"AED {row['amount_for_free_delivery']:.2f}" if row['amount_for_free_delivery'] and row['amount_for_free_delivery'] > 0 else '-')
+            # Only one page of entries goes into the HTML table, so its size doesn't grow with the fee list
+            page_count = (len(filtered_df) + FEE_TABLE_PAGE_SIZE - 1) // FEE_TABLE_PAGE_SIZE
+            if page_count > 1:
+                # The key includes the page count so the selection resets when a search changes it
+                page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1, key=f"fee_table_page_{page_count}")
+                filtered_df = filtered_df.iloc[(page - 1) * FEE_TABLE_PAGE_SIZE:page * FEE_TABLE_PAGE_SIZE]
+
+            # This view is read-only, so the whole table is rendered as one HTML string
+            # in a single markdown call instead of a row of widgets per entry
+            fee_rows = ''.join(
+                f"<tr><td>{html.escape(str(fee.id))}</td>"
+                f"<td>{html.escape(str(fee.location))}</td>"
+                f"<td>{html.escape(str(fee.zone)) if fee.zone else '-'}</td>"
+                f"<td>{fee.min_order_amount_fmt}</td>"
+                f"<td>{fee.delivery_charge_fmt}</td>"
+                f"<td>{fee.amount_for_free_delivery_fmt}</td></tr>"
+                for fee in filtered_df.itertuples(index=False)
+            )
+            st.markdown(
+                "<table class='fee-table'><thead><tr>"
+                "<th>ID</th><th>Location</th><th>Zone</th><th>Min Order (AED)</th><th>Charge (AED)</th><th>Free At (AED)</th>"
+                f"</tr></thead><tbody>{fee_rows}</tbody></table>",
+                unsafe_allow_html=True
+            )
             st.markdown("---")
         else:
             st.info("No delivery fee data found. Use the 'Add/Edit' tab to add an entry.")
@@ -1020,13 +1539,15 @@ elif selected_page == "Delivery Fee":
         form_key = f"add_edit_fee_form_id_{st.session_state.editing_delivery_fee_id}" if is_edit_mode else "add_edit_fee_form_new"
 
         with st.form(form_key):
+            # Input keys follow the fee being edited (like the PIN key), so each entry gets its own
+            # widgets seeded from its values instead of reusing the previous entry's state
             st.markdown("<h4>{} Delivery Fee</h4>".format("Edit" if is_edit_mode else "Add"), unsafe_allow_html=True)
             
-            location = st.text_input("Location/City", value=st.session_state.editing_delivery_fee_details.get('location', '') if is_edit_mode else '', key="location_input")
-            zone = st.text_input("Zone (Optional)", value=st.session_state.editing_delivery_fee_details.get('zone', '') if is_edit_mode else '', key="zone_input")
-            min_order_amount = st.number_input("Min. Order Amount (AED)", min_value=0.0, value=st.session_state.editing_delivery_fee_details.get('min_order_amount', 0.0) if is_edit_mode else 0.0, step=1.0, key="min_order_input")
-            delivery_charge = st.number_input("Delivery Charge (AED)", min_value=0.0, value=st.session_state.editing_delivery_fee_details.get('delivery_charge', 0.0) if is_edit_mode else 0.0, step=1.0, key="delivery_charge_input")
-            amount_for_free_delivery = st.number_input("Amount for Free Delivery (AED, Optional)", min_value=0.0, value=st.session_state.editing_delivery_fee_details.get('amount_for_free_delivery', 0.0) if is_edit_mode else 0.0, step=1.0, key="free_delivery_input")
+            location = st.text_input("Location/City", value=st.session_state.editing_delivery_fee_details.get('location', '') if is_edit_mode else '', key=f"location_input_{st.session_state.editing_delivery_fee_id}")
+            zone = st.text_input("Zone (Optional)", value=st.session_state.editing_delivery_fee_details.get('zone', '') if is_edit_mode else '', key=f"zone_input_{st.session_state.editing_delivery_fee_id}")
+            min_order_amount = st.number_input("Min. Order Amount (AED)", min_value=0.0, value=st.session_state.editing_delivery_fee_details.get('min_order_amount', 0.0) if is_edit_mode else 0.0, step=1.0, key=f"min_order_input_{st.session_state.editing_delivery_fee_id}")
+            delivery_charge = st.number_input("Delivery Charge (AED)", min_value=0.0, value=st.session_state.editing_delivery_fee_details.get('delivery_charge', 0.0) if is_edit_mode else 0.0, step=1.0, key=f"delivery_charge_input_{st.session_state.editing_delivery_fee_id}")
+            amount_for_free_delivery = st.number_input("Amount for Free Delivery (AED, Optional)", min_value=0.0, value=st.session_state.editing_delivery_fee_details.get('amount_for_free_delivery', 0.0) if is_edit_mode else 0.0, step=1.0, key=f"free_delivery_input_{st.session_state.editing_delivery_fee_id}")
             
             # New PIN field for security
             if is_edit_mode:
@@ -1053,62 +1574,72 @@ elif selected_page == "Delivery Fee":
                         # Attempt to update the fee
                         if update_delivery_fee_in_db(st.session_state.editing_delivery_fee_id, location, min_order_amount, delivery_charge, amount_for_free_delivery, zone):
                             # IMPORTANT: Re-fetch the data immediately after a successful update
-                            st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local()
+                            st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local(get_data_versions()['delivery_fees'])
                             # If update is successful, clear form, and stay on "Add/Edit" tab
-                            st.session_state.editing_delivery_fee_id = None
-                            st.session_state.editing_delivery_fee_details = {}
-                            st.session_state.selected_delivery_tab = "Add/Edit" # Stay on Add/Edit tab
+                            clear_delivery_fee_edit_state() # Stay on Add/Edit tab
                             st.rerun() # Explicit rerun to ensure UI updates after state changes
                     else:
                         # Add new fee
                         if add_delivery_fee_to_db(location, min_order_amount, delivery_charge, amount_for_free_delivery, zone):
                             # IMPORTANT: Re-fetch the data immediately after a successful add
-                            st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local()
+                            st.session_state.delivery_fees_df = fetch_delivery_fees_from_db_local(get_data_versions()['delivery_fees'])
                             st.session_state.selected_delivery_tab = "Add/Edit" # Stay on Add/Edit tab after adding
                             st.rerun() # Explicit rerun to ensure UI updates after state changes
         
-        st.markdown("---")
-        st.markdown("<h4>Existing Delivery Fees</h4>", unsafe_allow_html=True)
+        st.markdown("<hr/><h4>Existing Delivery Fees</h4>", unsafe_allow_html=True)
         
         if not st.session_state.delivery_fees_df.empty:
             fees_df_sorted = st.session_state.delivery_fees_df.sort_values(by='location')
 
-            header_cols = st.columns([0.5, 2, 1.5, 1.5, 1.5, 1.5, 1.5])
-            with header_cols[0]: st.markdown("<strong>ID</strong>", unsafe_allow_html=True)
-            with header_cols[1]: st.markdown("<strong>Location</strong>", unsafe_allow_html=True)
-            with header_cols[2]: st.markdown("<strong>Zone</strong>", unsafe_allow_html=True)
-            with header_cols[3]: st.markdown("<strong>Min Order (AED)</strong>", unsafe_allow_html=True)
-            with header_cols[4]: st.markdown("<strong>Charge (AED)</strong>", unsafe_allow_html=True)
-            with header_cols[5]: st.markdown("<strong>Free At (AED)</strong>", unsafe_allow_html=True)
-            with header_cols[6]: st.markdown("<strong>Actions</strong>", unsafe_allow_html=True)
-            st.markdown("---")
+            # A single editor payload instead of a row of widgets per entry; only the delete column is editable.
+            # Checked rows are tracked by position, so the key resets them whenever the entries change
+            edited_fees_df = st.data_editor(
+                # Same text as the Search/View table: preformatted amounts ('-' when there is no free-delivery amount) and '-' for a blank zone
+                fees_df_sorted[['id', 'location', 'min_order_amount_fmt', 'delivery_charge_fmt', 'amount_for_free_delivery_fmt']].assign(
+                    zone=fees_df_sorted['zone'].where(fees_df_sorted['zone'].fillna('').astype(str).str.strip() != '', '-'),
+                    delete=False
+                ),
+                hide_index=True,
+                width="stretch",
+                column_order=['id', 'location', 'zone', 'min_order_amount_fmt', 'delivery_charge_fmt', 'amount_for_free_delivery_fmt', 'delete'],
+                disabled=['id', 'location', 'zone', 'min_order_amount_fmt', 'delivery_charge_fmt', 'amount_for_free_delivery_fmt'],
+                key=f"fee_list_editor_{get_data_versions()['delivery_fees']}",
+                column_config={
+                    'delete': st.column_config.CheckboxColumn("Delete?"),
+                    'id': "ID",
+                    'location': "Location",
+                    'zone': "Zone",
+                    'min_order_amount_fmt': "Min Order",
+                    'delivery_charge_fmt': "Charge",
+                    'amount_for_free_delivery_fmt': "Free At",
+                }
+            )
+            fees_to_delete = edited_fees_df.loc[edited_fees_df['delete'], 'id'].tolist()
+            st.button(
+                f"🗑️ Delete Checked Entries ({len(fees_to_delete)})",
+                key="delete_checked_fees",
+                help="Delete every entry checked in the table above",
+                disabled=not fees_to_delete,
+                on_click=delete_and_rerun_fees,
+                args=(fees_to_delete,)
+            )
 
-            for index, row in fees_df_sorted.iterrows():
-                row_cols = st.columns([0.5, 2, 1.5, 1.5, 1.5, 1.5, 1.5])
-                with row_cols[0]: st.write(row['id'])
-                with row_cols[1]: st.write(row['location'])
-                with row_cols[2]: st.write(row['zone'] if row['zone'] else '-')
-                with row_cols[3]: st.write(f"AED {row['min_order_amount']:.2f}")
-                with row_cols[4]: st.write(f"AED {row['delivery_charge']:.2f}")
-                with row_cols[5]: st.write(f"AED {row['amount_for_free_delivery']:.2f}" if row['amount_for_free_delivery'] and row['amount_for_free_delivery'] > 0 else '-')
-                with row_cols[6]:
-                    edit_button_col, delete_button_col = st.columns(2)
-                    with edit_button_col:
-                        st.button(
-                            "✏️", 
-                            key=f"edit_fee_add_edit_{row['id']}", # Unique key for this tab's button
-                            help="Edit this entry",
-                            on_click=set_edit_fee_state,
-                            args=(row['id'],)
-                        )
-                    with delete_button_col:
-                        st.button(
-                            "🗑️", 
-                            key=f"delete_fee_add_edit_{row['id']}", # Unique key for this tab's button
-                            help="Delete this entry",
-                            on_click=delete_and_rerun_fee,
-                            args=(row['id'],)
-                        )
+            # Edit acts on one selected entry, so the widget count does not grow with the number of entries;
+            # deleting goes through the checkboxes above
+            fee_labels = dict(zip(fees_df_sorted['id'], fees_df_sorted['location'] + fees_df_sorted['zone'].map(lambda z: f" ({z})" if z else '')))
+            selected_fee_id = st.selectbox(
+                "Select a delivery fee entry to edit:",
+                options=list(fee_labels),
+                format_func=fee_labels.get,
+                key="fee_action_select"
+            )
+            st.button(
+                "✏️ Edit Entry",
+                key="edit_fee_add_edit",
+                help="Edit the selected entry",
+                on_click=set_edit_fee_state,
+                args=(selected_fee_id,)
+            )
             st.markdown("---")
         else:
             st.info("No delivery fee entries yet. Add one using the form above!")